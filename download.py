@@ -2,24 +2,98 @@
 from __future__ import annotations
 
 import os
-import json
+import hashlib
 import time
+import asyncio
+import itertools
+from io import BytesIO
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
-from github import Github
-from github import UnknownObjectException
-
+import aiohttp
 import click
+import orjson
 import pandas as pd
-import requests
 from rich import print
 from rich.progress import track
 
 THIS_DIR = Path(__file__).parent
+CACHE_DIR = THIS_DIR / ".cache"
+
+# One or more comma-separated tokens; requests are spread across all of them
+GH_API_TOKENS = [
+    t.strip()
+    for t in (os.getenv("GH_API_TOKENS") or os.getenv("GH_API_TOKEN", "")).split(",")
+    if t.strip()
+]
 
 # URL to the canonical orgs.csv from the open-journalism repository
 ORGS_CSV_URL = "https://raw.githubusercontent.com/silva-shih/open-journalism/master/orgs.csv"
 
+# How many days to keep old copies of orgs.csv around
+ORGS_CACHE_DAYS = 7
+
+# GitHub's GraphQL endpoint, which lets us pull 100 repos per request
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# How many times to retry a request that ran into GitHub's rate limits
+MAX_RETRIES = 5
+
+# Column types for repos.csv, keeping counts and strings compact in memory
+REPO_DTYPES = {
+    "org": "string[pyarrow]",
+    "name": "string[pyarrow]",
+    "full_name": "string[pyarrow]",
+    "homepage": "object",
+    "description": "string[pyarrow]",
+    "language": "string[pyarrow]",
+    "created_at": "object",
+    "updated_at": "object",
+    "pushed_at": "object",
+    "fork": "bool",
+    "stargazers_count": "uint32",
+    "watchers_count": "uint32",
+    "forks_count": "uint32",
+    "open_issues_count": "uint32",
+    "license": "string[pyarrow]",
+    "topics": "object",
+}
+
+# The same fields are requested whether the handle is an organization or a user
+REPO_QUERY = """
+fragment RepoPage on RepositoryConnection {
+  pageInfo { endCursor hasNextPage }
+  nodes {
+    name
+    nameWithOwner
+    description
+    homepageUrl
+    primaryLanguage { name }
+    stargazerCount
+    forkCount
+    issues(states: OPEN) { totalCount }
+    pullRequests(states: OPEN) { totalCount }
+    licenseInfo { name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+    createdAt
+    updatedAt
+    pushedAt
+    isFork
+  }
+}
+
+query($login: String!, $cursor: String) {
+  repositoryOwner(login: $login) {
+    ... on Organization {
+      repositories(first: 100, after: $cursor, privacy: PUBLIC, ownerAffiliations: OWNER) { ...RepoPage }
+    }
+    ... on User {
+      repositories(first: 100, after: $cursor, privacy: PUBLIC, ownerAffiliations: OWNER) { ...RepoPage }
+    }
+  }
+}
+"""
+
 
 @click.command()
 @click.option(
@@ -29,34 +103,129 @@ ORGS_CSV_URL = "https://raw.githubusercontent.com/silva-shih/open-journalism/mas
     help="Force the download of the data.",
 )
 @click.option(
-    "-w",
-    "--wait",
-    default=1,
-    help="Number of seconds to wait between requests.",
+    "-c",
+    "--concurrency",
+    default=20,
+    help="Number of orgs to download at the same time per GitHub token.",
+)
+@click.option(
+    "--csv/--no-csv",
+    default=True,
+    help="Also write repos.csv alongside repos.parquet.",
 )
-def cli(force: bool, wait: int) -> None:
+def cli(force: bool, concurrency: int, csv: bool) -> None:
     """Download repos for analysis."""
+    asyncio.run(main(force=force, concurrency=concurrency, csv=csv))
+
+
+async def main(force: bool = False, concurrency: int = 20, csv: bool = True) -> None:
+    """Download the repos for every org in orgs.csv.
+
+    Args:
+        force: If True, force the download.
+        concurrency: Number of orgs to download at the same time per GitHub token.
+        csv: If True, also write repos.csv alongside repos.parquet.
+    """
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        org_df = await load_orgs(session, force=force)
+        repo_list, etag = await download_orgs(session, parse_handles(org_df), force, concurrency)
+
+    # Skip rewriting any output that already matches the current data
+    outputs = [THIS_DIR / "repos.parquet"]
+    if csv:
+        outputs.append(THIS_DIR / "repos.csv")
+    stale = [p for p in outputs if not p.exists() or _read_etag(p) != etag]
+    if not stale:
+        print("[green]No changes since the last download.[/green]")
+        return
+
+    # Convert to a dataframe
+    repo_df = (
+        pd.DataFrame.from_records(repo_list, columns=list(REPO_DTYPES))
+        .astype(REPO_DTYPES)
+        .sort_values(["org", "name"], kind="stable")
+    )
+
+    # Write out each stale file, recording which data it holds
+    (THIS_DIR / "data").mkdir(exist_ok=True, parents=True)
+    for path in stale:
+        if path.suffix == ".parquet":
+            repo_df.to_parquet(path, index=False)
+        else:
+            repo_df.to_csv(path, index=False)
+        _etag_path(path).write_text(etag)
+
+
+def _etag_path(output_path: Path) -> Path:
+    """Where to record the digest of the data last written to an output file."""
+    return THIS_DIR / "data" / f"{output_path.name}.etag"
+
+
+def _read_etag(output_path: Path) -> str | None:
+    """Read the digest of the data last written to an output file, if any."""
+    etag_path = _etag_path(output_path)
+    return etag_path.read_text() if etag_path.exists() else None
+
+
+async def load_orgs(session: aiohttp.ClientSession, force: bool = False) -> pd.DataFrame:
+    """Load orgs.csv, reusing today's copy unless forced.
+
+    Args:
+        session: The HTTP session to download with.
+        force: If True, force the download.
+
+    Returns:
+        The orgs.csv dataframe.
+    """
+    # Clear out stale copies
+    CACHE_DIR.mkdir(exist_ok=True, parents=True)
+    cutoff = date.today() - timedelta(days=ORGS_CACHE_DAYS)
+    for old_path in CACHE_DIR.glob("orgs-*.csv"):
+        if old_path.stem.removeprefix("orgs-") < cutoff.strftime("%Y%m%d"):
+            old_path.unlink()
+
+    # Skip it if we already have today's file
+    orgs_path = CACHE_DIR / f"orgs-{date.today().strftime('%Y%m%d')}.csv"
+    if orgs_path.exists() and not force:
+        print(f"[cyan]Using cached {orgs_path.name}[/cyan]")
+        return pd.read_csv(orgs_path, engine="pyarrow")
+
     # Fetch the orgs.csv from the remote repository
     print(f"[cyan]Fetching orgs.csv from {ORGS_CSV_URL}[/cyan]")
     try:
-        response = requests.get(ORGS_CSV_URL, timeout=10)
-        response.raise_for_status()
-        org_df = pd.read_csv(pd.io.common.StringIO(response.text))
+        async with session.get(ORGS_CSV_URL) as response:
+            response.raise_for_status()
+            content = await response.read()
+        org_df = pd.read_csv(BytesIO(content), engine="pyarrow")
         print(f"[green]✓ Fetched {len(org_df)} organizations[/green]")
     except Exception as e:
         print(f"[red]Error fetching orgs.csv: {e}[/red]")
         raise SystemExit(1)
 
+    # Save it for the rest of the day
+    orgs_path.write_bytes(content)
+    return org_df
+
+
+def parse_handles(org_df: pd.DataFrame) -> list[str]:
+    """Parse the deduplicated GitHub handles out of orgs.csv.
+
+    Args:
+        org_df: The orgs.csv dataframe.
+
+    Returns:
+        A list of GitHub handles.
+    """
     # Parse out the github handles
-    org_df['handle'] = org_df['Github'].apply(lambda x: x.split("/")[-1].lower().strip())
+    org_df['handle'] = org_df['Github'].str.rsplit("/", n=1).str[-1].str.lower().str.strip()
 
-    # Assert that none of the handles are empty strings
-    try:
-        assert not any(org_df.handle == "")
-    except AssertionError:
-        empty_handles = org_df[org_df.handle == ""].Github.unique()
+    # Make sure none of the handles are empty strings
+    empty = org_df.handle.eq("")
+    if empty.any():
+        empty_handles = org_df[empty].Github.unique()
         print(f"Empty handles: {empty_handles}")
-        raise
+        raise AssertionError("Found empty GitHub handles in orgs.csv")
 
     # Check for duplicate handles and deduplicate
     if org_df.handle.duplicated().any():
@@ -65,85 +234,268 @@ def cli(force: bool, wait: int) -> None:
         print(f"[yellow]Keeping first occurrence of each duplicate[/yellow]")
         org_df = org_df.drop_duplicates(subset=['handle'], keep='first')
 
-    # Loop through the repositories
-    repo_list = []
-    for org in track(list(org_df.handle)):
-        repo_list += get_repo_list(org, force=force, wait=wait)
+    return list(org_df.handle)
 
-    # Convert to a dataframe
-    repo_df = pd.DataFrame(repo_list).sort_values(["org", "name"])
 
-    # Create the output directory
-    repo_df.to_csv(THIS_DIR / "repos.csv", index=False)
+async def download_orgs(
+    session: aiohttp.ClientSession,
+    orgs: list[str],
+    force: bool = False,
+    concurrency: int = 20,
+) -> tuple[list[dict], str]:
+    """Download the repos for many orgs at once.
+
+    Args:
+        session: The HTTP session to download with.
+        orgs: The organizations or users to download.
+        force: If True, force the download.
+        concurrency: Number of orgs to download at the same time per GitHub token.
 
+    Returns:
+        A list of dictionaries with the repo information for every org, and a
+        digest that changes whenever any org's repos do.
+    """
+    tokens = TokenPool(GH_API_TOKENS, concurrency)
+    sem = asyncio.Semaphore(concurrency * max(len(GH_API_TOKENS), 1))
+    tasks = [
+        asyncio.create_task(get_repo_list(session, sem, tokens, org, force=force))
+        for org in orgs
+    ]
 
-def get_repo_list(org: str, force: bool = False, wait: int = 1) -> list[dict]:
+    # Collect the repos as each org finishes
+    repo_list = []
+    etags = {}
+    try:
+        for task in track(asyncio.as_completed(tasks), total=len(tasks)):
+            org, etag, d_list = await task
+            etags[org] = etag
+            repo_list += d_list
+    except BaseException:
+        # Don't leave the other orgs running, or their errors unretrieved
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return repo_list, _digest(sorted(etags.items()))
+
+
+async def get_repo_list(
+    session: aiohttp.ClientSession,
+    sem: asyncio.Semaphore,
+    tokens: TokenPool,
+    org: str,
+    force: bool = False,
+) -> tuple[str, str, list[dict]]:
     """Get the repos for a given org.
 
     Args:
+        session: The HTTP session to download with.
+        sem: Semaphore limiting how many orgs are downloaded at once.
+        tokens: The GitHub tokens to authenticate with.
         org: The organization or user to download.
         force: If True, force the download.
-        wait: Number of seconds to wait between requests.
 
     Returns:
-        A list of dictionaries with the repo information.
+        The org, a digest of its repos and a list of dictionaries with the repo information.
     """
     # Skip it if we already have the file
     data_path = THIS_DIR / "data" / f"{org}.json"
     data_path.parent.mkdir(exist_ok=True, parents=True)
-    if data_path.exists() and not force:
-        return json.load(open(data_path, 'r'))
+    cached = None if force else _read_cache(data_path)
+    if cached is not None:
+        return org, cached["etag"], cached["data"]
 
-    # Login to GitHub
-    g = Github(os.getenv("GH_API_TOKEN"))
+    # Page through the repos, 100 at a time
+    async with sem:
+        print(f"Downloading {org}")
+        d_list = []
+        cursor = None
+        while True:
+            payload = await _post_graphql(session, tokens, {"login": org, "cursor": cursor})
+            errors = [e for e in payload.get("errors", []) if e.get("type") != "NOT_FOUND"]
+            if errors:
+                raise RuntimeError(f"GraphQL error for {org}: {errors}")
 
-    # Try to download an org
-    print(f"Downloading {org}")
-    try:
-        repo_list = g.get_organization(org).get_repos()
-    except UnknownObjectException:
-        try:
-            # Try to download a user
-            repo_list = g.get_user(org).get_repos()
-        except UnknownObjectException:
-            # Give up
-            return []
-
-    def _get_license(r):
-       return r.license.name if r.license else None
-    
-    # Parse out each repo and when it was created    
-    d_list = []
-    for r in repo_list:
-        d = dict(
-            org=org,
-            name=r.name,
-            full_name=r.full_name,
-            homepage=r.homepage,
-            description=r.description,
-            language=r.language,
-            created_at=str(r.created_at),
-            updated_at=str(r.updated_at),
-            pushed_at=str(r.pushed_at),
-            fork=r.fork,
-            stargazers_count=r.stargazers_count,
-            watchers_count=r.watchers_count,
-            forks_count=r.forks_count,
-            open_issues_count=r.open_issues_count,
-            license=_get_license(r),
-            topics=r.topics,
-        )
-        d_list.append(d)
-
-    # Write it out
-    with open(data_path, "w") as fp:
-        json.dump(d_list, fp, indent=2)
-
-    # Wait a bit
-    time.sleep(wait)
+            # Give up if there's no org or user by that name
+            owner = (payload.get("data") or {}).get("repositoryOwner")
+            if owner is None:
+                break
+
+            page = owner["repositories"]
+            d_list += [_parse_repo(org, r) for r in page["nodes"]]
+
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            cursor = page["pageInfo"]["endCursor"]
+
+    # Write it out, unless nothing has changed since the last download
+    etag = _digest(d_list)
+    if cached is None or cached["etag"] != etag:
+        data_path.write_bytes(orjson.dumps({"etag": etag, "data": d_list}))
 
     # Return the data
-    return d_list
+    return org, etag, d_list
+
+
+def _read_cache(data_path: Path) -> dict | None:
+    """Read an org's cached download, if there is one.
+
+    Args:
+        data_path: The path to the org's JSON file.
+
+    Returns:
+        A dictionary with the "etag" and "data" for the org, or None.
+    """
+    if not data_path.exists():
+        return None
+    try:
+        cached = orjson.loads(data_path.read_bytes())
+    except orjson.JSONDecodeError:
+        print(f"[yellow]Ignoring unreadable cache {data_path.name}[/yellow]")
+        return None
+
+    # Older downloads stored a bare list of repos
+    if isinstance(cached, list):
+        cached = {"etag": _digest(cached), "data": cached}
+    return cached
+
+
+def _digest(obj) -> str:
+    """Hash JSON-serializable data into a pseudo-ETag."""
+    return hashlib.sha256(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class TokenPool:
+    """Round-robin over GitHub tokens, skipping any that have hit their rate limit."""
+
+    def __init__(self, tokens: list[str], concurrency: int):
+        """Create the pool.
+
+        Args:
+            tokens: The GitHub tokens to rotate through.
+            concurrency: Maximum number of requests in flight per token.
+        """
+        self.tokens = tokens
+        self.semaphores = {t: asyncio.Semaphore(concurrency) for t in tokens}
+        self._cooldowns = {t: 0.0 for t in tokens}
+        self._cycle = itertools.cycle(tokens)
+
+    async def acquire(self) -> str:
+        """Return the next token that isn't cooling down, waiting if they all are."""
+        while True:
+            for _ in self.tokens:
+                token = next(self._cycle)
+                if self._cooldowns[token] <= time.time():
+                    return token
+            delay = min(self._cooldowns.values()) - time.time()
+            print(f"[yellow]All tokens rate limited, waiting {delay:.0f} seconds[/yellow]")
+            await asyncio.sleep(max(delay, 0))
+
+    def cool_down(self, token: str, delay: float) -> None:
+        """Take a token out of rotation for the given number of seconds."""
+        self._cooldowns[token] = max(self._cooldowns[token], time.time() + delay)
+
+
+async def _post_graphql(
+    session: aiohttp.ClientSession,
+    tokens: TokenPool,
+    variables: dict,
+) -> dict:
+    """Run the repo query, rotating tokens whenever GitHub's rate limits are hit.
+
+    Args:
+        session: The HTTP session to download with.
+        tokens: The GitHub tokens to authenticate with.
+        variables: The variables for the GraphQL query.
+
+    Returns:
+        The decoded JSON response.
+    """
+    # Only insist on a token once an org actually needs downloading
+    if not tokens.tokens:
+        raise SystemExit("Set GH_API_TOKENS or GH_API_TOKEN to download repos.")
+
+    body = {"query": REPO_QUERY, "variables": variables}
+    for _ in range(MAX_RETRIES * len(tokens.tokens)):
+        token = await tokens.acquire()
+        headers = {"Authorization": f"bearer {token}"}
+        async with tokens.semaphores[token]:
+            async with session.post(GRAPHQL_URL, json=body, headers=headers) as response:
+                if _is_rate_limited(response):
+                    tokens.cool_down(token, _get_rate_limit_delay(response.headers))
+                    continue
+                response.raise_for_status()
+                payload = await response.json()
+
+            # GraphQL can also report an exhausted limit in a 200 response
+            errors = payload.get("errors") or []
+            if any(e.get("type") == "RATE_LIMITED" for e in errors):
+                tokens.cool_down(token, _get_rate_limit_delay(response.headers))
+                continue
+
+            # Rest the token early if this request used up the last of its budget
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                tokens.cool_down(token, _get_rate_limit_delay(response.headers))
+            return payload
+    raise RuntimeError(f"Still rate limited after {MAX_RETRIES} attempts per token")
+
+
+def _is_rate_limited(response: aiohttp.ClientResponse) -> bool:
+    """Tell rate-limited responses apart from other errors, like permission denials."""
+    if response.status == 429:
+        return True
+    if response.status == 403:
+        headers = response.headers
+        return "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"
+    return False
+
+
+def _get_rate_limit_delay(headers) -> float:
+    """Work out how long to wait from a rate-limited response's headers."""
+    if "Retry-After" in headers:
+        return float(headers["Retry-After"])
+    if headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in headers:
+        return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+    return 60.0
+
+
+def _parse_timestamp(value: str | None) -> str:
+    """Format a GraphQL timestamp the same way PyGithub's datetimes were stringified."""
+    if value is None:
+        return str(value)
+    return str(datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _parse_repo(org: str, r: dict) -> dict:
+    """Map a GraphQL repository node onto the dict shape stored in repos.csv.
+
+    Args:
+        org: The organization or user the repo belongs to.
+        r: A repository node from the GraphQL response.
+
+    Returns:
+        A dictionary with the repo information.
+    """
+    return dict(
+        org=org,
+        name=r["name"],
+        full_name=r["nameWithOwner"],
+        homepage=r["homepageUrl"] or None,
+        description=r["description"],
+        language=r["primaryLanguage"]["name"] if r["primaryLanguage"] else None,
+        created_at=_parse_timestamp(r["createdAt"]),
+        updated_at=_parse_timestamp(r["updatedAt"]),
+        pushed_at=_parse_timestamp(r["pushedAt"]),
+        fork=r["isFork"],
+        stargazers_count=r["stargazerCount"],
+        # The REST API's watchers_count has always mirrored the star count
+        watchers_count=r["stargazerCount"],
+        forks_count=r["forkCount"],
+        # The REST API counts open pull requests as open issues
+        open_issues_count=r["issues"]["totalCount"] + r["pullRequests"]["totalCount"],
+        license=r["licenseInfo"]["name"] if r["licenseInfo"] else None,
+        topics=[t["topic"]["name"] for t in r["repositoryTopics"]["nodes"]],
+    )
 
 
 if __name__ == "__main__":
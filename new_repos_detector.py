@@ -21,7 +21,7 @@ THIS_DIR = Path(__file__).parent
 @click.option(
     "-c",
     "--current",
-    default="repos.csv",
+    default="repos.parquet",
     help="Path to current repos snapshot",
 )
 def cli(previous: str, current: str) -> None:
@@ -37,14 +37,15 @@ def cli(previous: str, current: str) -> None:
 
     # Load dataframes
     try:
-        previous_df = pd.read_csv(previous_path)
-        current_df = pd.read_csv(current_path)
+        previous_df = read_snapshot(previous_path)
+        current_df = read_snapshot(current_path)
     except Exception as e:
-        print(f"[red]Error reading CSV files: {e}[/red]")
+        print(f"[red]Error reading snapshot files: {e}[/red]")
         sys.exit(1)
 
     # Find new repos (present in current but not in previous)
-    new_repos = current_df[~current_df['full_name'].isin(previous_df['full_name'])]
+    previous_names = pd.Index(previous_df['full_name'].unique())
+    new_repos = current_df[~current_df['full_name'].isin(previous_names)]
 
     if len(new_repos) == 0:
         print("[green]No new repositories detected.[/green]")
@@ -65,5 +66,24 @@ def cli(previous: str, current: str) -> None:
     sys.exit(1)
 
 
+def read_snapshot(path: Path) -> pd.DataFrame:
+    """Read a repos snapshot saved as either Parquet or CSV.
+
+    The two formats can be compared with each other, since only full_name is diffed.
+    """
+    if path.suffix != ".parquet":
+        return pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow")
+
+    # Parquet hands topics back as arrays, so turn them into plain lists to
+    # keep them written out as "['a', 'b']", the same as in repos.csv
+    df = pd.read_parquet(path, dtype_backend="pyarrow")
+    df["topics"] = pd.Series(
+        [[] if t is None or t is pd.NA else list(t) for t in df["topics"]],
+        index=df.index,
+        dtype=object,
+    )
+    return df
+
+
 if __name__ == "__main__":
     cli()
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import os
 import sys
+import json
+import hashlib
 import logging
 from pathlib import Path
 from datetime import datetime, timezone
@@ -15,31 +17,66 @@ from rich import print
 
 THIS_DIR = Path(__file__).parent
 
+# Where DeepL translations are kept between runs
+CACHE_DIR = THIS_DIR / ".cache"
+DEEPL_CACHE_PATH = CACHE_DIR / "deepl.json"
+
+# Bluesky expects createdAt as an ISO 8601 UTC timestamp ending in "Z"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# How many posts to publish per applyWrites request
+BATCH_SIZE = 25
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def translate_to_norwegian(text: str) -> str:
-    """
-    Translate text to Norwegian using DeepL API.
-    Falls back to original text if translation fails.
+def translate_to_norwegian(texts: list[str]) -> dict[str, str]:
     """
-    if not text or not text.strip():
-        return text
+    Translate texts to Norwegian using DeepL API, in a single request.
+    Translations are cached on disk so repeated texts are only sent once.
+    Falls back to the original text if translation fails.
 
-    api_key = os.getenv("DEEPL_API_KEY")
-    if not api_key:
-        logger.warning("DEEPL_API_KEY not set, skipping translation")
-        return text
+    Args:
+        texts: Texts to translate
+
+    Returns:
+        Mapping from each text to its translation
+    """
+    texts = list(dict.fromkeys(t for t in texts if t and t.strip()))
+    if not texts:
+        return {}
 
+    cache = {}
     try:
-        translator = deepl.Translator(api_key)
-        result = translator.translate_text(text, target_lang="NB")  # Norwegian Bokmål
-        return result.text
+        if DEEPL_CACHE_PATH.exists():
+            cache = json.loads(DEEPL_CACHE_PATH.read_text(encoding="utf-8"))
     except Exception as e:
-        logger.warning(f"Translation failed: {e}")
-        return text  # Return original on failure
+        logger.warning(f"Ignoring unreadable translation cache: {e}")
+
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    missing = [t for t in texts if _key(t) not in cache]
+    if missing:
+        api_key = os.getenv("DEEPL_API_KEY")
+        if not api_key:
+            logger.warning("DEEPL_API_KEY not set, skipping translation")
+            return {t: cache.get(_key(t), t) for t in texts}
+
+        try:
+            translator = deepl.Translator(api_key)
+            results = translator.translate_text(missing, target_lang="NB")  # Norwegian Bokmål
+            for text, result in zip(missing, results):
+                cache[_key(text)] = result.text
+            CACHE_DIR.mkdir(exist_ok=True, parents=True)
+            DEEPL_CACHE_PATH.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+        except Exception as e:
+            logger.warning(f"Translation failed: {e}")
+
+    # Return original on failure
+    return {t: cache.get(_key(t), t) for t in texts}
 
 
 def authenticate_bluesky(username: str, password: str) -> Client:
@@ -86,12 +123,18 @@ def authenticate_bluesky(username: str, password: str) -> Client:
         raise SystemExit("Unable to proceed without Bluesky authentication.")
 
 
-def create_repo_post(repo: dict) -> dict:
+def create_repo_post(
+    repo: dict,
+    created_at: str | None = None,
+    translations: dict[str, str] | None = None,
+) -> dict:
     """
     Create a Bluesky post record for a new repository.
 
     Args:
         repo: Dictionary containing repository information
+        created_at: Timestamp for the post, defaults to now
+        translations: Norwegian translations of repository descriptions
 
     Returns:
         Post record ready to be posted to Bluesky
@@ -100,35 +143,28 @@ def create_repo_post(repo: dict) -> dict:
     repo_name = repo['name']
     full_name = repo['full_name']
     repo_url = f"https://github.com/{full_name}"
-    description = repo.get('description', '')
+    description = repo.get('description')
+    if not isinstance(description, str):
+        description = ''
 
-    # Translate description to Norwegian
-    if pd.notna(description) and description:
-        description = translate_to_norwegian(description)
+    # Swap in the Norwegian description
+    if description and translations:
+        description = translations.get(description, description)
 
-    # Construct the post text (Norwegian)
-    if pd.notna(description) and description:
-        text = f"{org} har nettopp åpnet repoet {full_name}: {repo_url}\n\n{description}"
-    else:
-        text = f"{org} har nettopp åpnet repoet {full_name}: {repo_url}"
-
-    # Truncate if too long (Bluesky has a 300 character limit)
-    if len(text) > 300:
-        # Calculate how much space we have for description
-        base_text = f"{org} har nettopp åpnet repoet {full_name}: {repo_url}\n\n"
-        remaining = 300 - len(base_text) - 3  # -3 for "..."
-        if remaining > 0 and pd.notna(description):
-            text = base_text + description[:remaining] + "..."
-        else:
-            text = f"{org} har nettopp åpnet repoet {full_name}: {repo_url}"
+    # Construct the post text (Norwegian), with the URL right after the prefix
+    prefix = f"{org} har nettopp åpnet repoet {full_name}: "
+    base_text = f"{prefix}{repo_url}"
 
-    # Encode the text to UTF-8 to properly calculate byte positions
-    text_bytes = text.encode('utf-8')
-    url_bytes = repo_url.encode('utf-8')
+    # Truncate the description if too long (Bluesky has a 300 character limit)
+    budget = 300 - len(base_text) - 2  # -2 for the blank line
+    if len(description) > budget:
+        description = description[:budget - 1].rstrip() + "…" if budget > 1 else ''
 
-    # Find the byte positions of the URL in the UTF-8 encoded text
-    url_start = text_bytes.find(url_bytes)
-    url_end = url_start + len(url_bytes)
+    text = f"{base_text}\n\n{description}" if description else base_text
+
+    # Facets index into the UTF-8 encoded text, and the URL always follows the prefix
+    url_start = len(prefix.encode('utf-8'))
+    url_end = url_start + len(repo_url.encode('utf-8'))
 
     # Create facets to make the URL clickable
     facets = [
@@ -149,7 +185,7 @@ def create_repo_post(repo: dict) -> dict:
         "$type": "app.bsky.feed.post",
         "text": text,
         "facets": facets,
-        "createdAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "createdAt": created_at or datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT),
     }
 
     return record
@@ -191,6 +227,49 @@ def post_to_bluesky(client: Client, record: dict) -> bool:
         return False
 
 
+def post_batch_to_bluesky(client: Client, records: list[dict]) -> list[bool]:
+    """
+    Post many records to Bluesky, batching them into applyWrites requests.
+    Falls back to posting one at a time if a batch fails.
+
+    Args:
+        client: Authenticated Bluesky client
+        records: Post records to publish
+
+    Returns:
+        Whether each record was posted successfully, in the same order
+    """
+    if not hasattr(client, 'did') or not client.did:
+        logger.error("Client object does not have valid DID information.")
+        return [False] * len(records)
+
+    results = []
+    for i in range(0, len(records), BATCH_SIZE):
+        batch = records[i:i + BATCH_SIZE]
+        writes = [
+            {
+                "$type": "com.atproto.repo.applyWrites#create",
+                "collection": "app.bsky.feed.post",
+                "value": record,
+            }
+            for record in batch
+        ]
+        try:
+            client.com.atproto.repo.apply_writes(
+                data={
+                    "repo": client.did,
+                    "writes": writes,
+                }
+            )
+            logger.info(f"Published a batch of {len(batch)} post(s)")
+            results += [True] * len(batch)
+        except Exception as e:
+            logger.warning(f"Batch post failed, retrying one at a time: {e}")
+            results += [post_to_bluesky(client, record) for record in batch]
+
+    return results
+
+
 @click.command()
 @click.option(
     "-n",
@@ -215,7 +294,7 @@ def cli(new_repos_file: str, dry_run: bool) -> None:
 
     # Load new repos
     try:
-        new_repos_df = pd.read_csv(new_repos_path)
+        new_repos_df = pd.read_csv(new_repos_path, engine="pyarrow", dtype_backend="pyarrow")
     except Exception as e:
         print(f"[red]Error reading new repos file: {e}[/red]")
         sys.exit(1)
@@ -234,10 +313,20 @@ def cli(new_repos_file: str, dry_run: bool) -> None:
         print("[red]Error: BLUESKY_USERNAME and BLUESKY_PASSWORD environment variables must be set[/red]")
         sys.exit(1)
 
+    repos = new_repos_df.to_dict(orient="records")
+
+    # Translate all the descriptions to Norwegian at once
+    translations = translate_to_norwegian(
+        [r['description'] for r in repos if isinstance(r['description'], str)]
+    )
+
+    # Stamp every post in this run with the same time
+    created_at = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+
     if dry_run:
         print("[yellow]DRY RUN MODE - Not actually posting[/yellow]")
-        for _, repo in new_repos_df.iterrows():
-            record = create_repo_post(repo.to_dict())
+        for repo in repos:
+            record = create_repo_post(repo, created_at, translations)
             print(f"\n[cyan]Would post:[/cyan]")
             print(f"  {record['text']}")
         sys.exit(0)
@@ -245,13 +334,13 @@ def cli(new_repos_file: str, dry_run: bool) -> None:
     # Authenticate to Bluesky
     client = authenticate_bluesky(username, password)
 
-    # Post each new repo
-    success_count = 0
-    for _, repo in new_repos_df.iterrows():
-        print(f"\n[cyan]Posting: {repo['full_name']}[/cyan]")
-        record = create_repo_post(repo.to_dict())
+    # Post all the new repos in batches
+    records = [create_repo_post(repo, created_at, translations) for repo in repos]
+    results = post_batch_to_bluesky(client, records)
 
-        if post_to_bluesky(client, record):
+    success_count = 0
+    for repo, posted in zip(repos, results):
+        if posted:
             success_count += 1
             print(f"[green]✓ Successfully posted {repo['full_name']}[/green]")
         else: